@@ -11,7 +11,7 @@ libraries.  Key features include:
 * A basic AI summarisation endpoint powered by the Hugging Face
   ``transformers`` library to condense long case descriptions into
   brief abstracts.  The summariser runs locally and does not
-  require external API keys.  See the ``summarise_text`` function
+  require external API keys.  See the ``submit_summary`` function
   below for details.
 * Simple bootstrap‑based templates for a responsive UI.
 
@@ -24,26 +24,302 @@ validation, and compliance with relevant data protection laws.
 
 from __future__ import annotations
 
+import hashlib
 import os
-from datetime import datetime
+import queue
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import date, datetime
 from typing import Optional
 
 from flask import (Flask, render_template, redirect, url_for, request,
-                   session, flash)
+                   session, flash, jsonify)
+from jinja2 import FileSystemBytecodeCache
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_sqlalchemy import SQLAlchemy
+import sqlalchemy as sa
 
-# Try importing summarisation pipeline.  If transformers isn't
-# available the summariser will fallback to returning the first
-# sentence of the input.
-try:
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
+# Summaries come from a distilled BART exported to ONNX and quantised to
+# int8, which is several times faster and smaller than the full
+# ``facebook/bart-large-cnn`` on CPU.  The export is done once and kept
+# under ``ONNX_MODEL_DIR``.
+SUMMARY_MODEL = "sshleifer/distilbart-cnn-12-6"
+ONNX_MODEL_DIR = os.path.join(BASE_DIR, ".onnx_cache", "distilbart-cnn-12-6")
+_ONNX_COMPONENTS = (
+    "encoder_model.onnx",
+    "decoder_model.onnx",
+    "decoder_with_past_model.onnx",
+)
+
+# The summarisation pipeline is loaded lazily on first use (see
+# ``get_summariser``) so importing this module stays cheap.  If
+# transformers isn't available the summariser will fallback to
+# returning the first sentence of the input.
+_summariser = None
+_summariser_loaded = False
+_summariser_lock = threading.Lock()
+_export_lock = threading.Lock()
+
+
+def export_summary_model() -> str:
+    """Export and int8-quantise the summary model if not already on disk.
+
+    Returns the directory holding the quantised ONNX files.  Raises
+    ``ImportError`` if ``optimum[onnxruntime]`` isn't installed.
+    """
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTQuantizer  # type: ignore
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig  # type: ignore
+    from transformers import AutoTokenizer  # type: ignore
+
+    with _export_lock:
+        if os.path.exists(os.path.join(ONNX_MODEL_DIR, "config.json")):
+            return ONNX_MODEL_DIR
+        export_dir = ONNX_MODEL_DIR + ".fp32"
+        model = ORTModelForSeq2SeqLM.from_pretrained(
+            SUMMARY_MODEL, export=True, provider="CPUExecutionProvider"
+        )
+        model.save_pretrained(export_dir)
+        qconfig = AutoQuantizationConfig.avx512_vnni(
+            is_static=False, per_channel=False
+        )
+        for file_name in _ONNX_COMPONENTS:
+            if os.path.exists(os.path.join(export_dir, file_name)):
+                ORTQuantizer.from_pretrained(
+                    export_dir, file_name=file_name
+                ).quantize(save_dir=ONNX_MODEL_DIR, quantization_config=qconfig)
+        AutoTokenizer.from_pretrained(SUMMARY_MODEL).save_pretrained(
+            ONNX_MODEL_DIR
+        )
+        # ``config.json`` marks the export as complete, so write it last.
+        model.config.save_pretrained(ONNX_MODEL_DIR)
+        # The fp32 export is over a gigabyte and no longer needed.
+        shutil.rmtree(export_dir, ignore_errors=True)
+    return ONNX_MODEL_DIR
+
+
+def _load_onnx_summariser():
+    import onnxruntime  # type: ignore
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM  # type: ignore
+    from transformers import AutoTokenizer, pipeline  # type: ignore
+
+    model_dir = export_summary_model()
+    # Under gunicorn ``SUMMARY_THREADS`` is set from the worker count (see
+    # gunicorn.conf.py) so the workers' sessions don't fight over the CPUs.
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = max(
+        1, int(os.environ.get("SUMMARY_THREADS", os.cpu_count() or 1))
+    )
+    model = ORTModelForSeq2SeqLM.from_pretrained(
+        model_dir,
+        encoder_file_name="encoder_model_quantized.onnx",
+        decoder_file_name="decoder_model_quantized.onnx",
+        decoder_with_past_file_name="decoder_with_past_model_quantized.onnx",
+        provider="CPUExecutionProvider",
+        session_options=options,
+    )
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    return pipeline("summarization", model=model, tokenizer=tokenizer)
+
+
+def _load_torch_summariser():
+    import torch  # type: ignore
+
+    # One intra-op thread per process; gunicorn already runs several
+    # workers so more threads only oversubscribe.
+    torch.set_num_threads(1)
     from transformers import pipeline  # type: ignore
-    summariser = pipeline("summarization", model="facebook/bart-large-cnn")
-except Exception:
-    summariser = None
 
+    return pipeline("summarization", model=SUMMARY_MODEL)
 
-BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
+def get_summariser():
+    """Return the shared summarisation pipeline, loading it on first use.
+
+    The quantised ONNX model is preferred; without ``optimum`` the same
+    model is run through plain PyTorch.  Loading only happens once per
+    process and only when a summary is actually requested.  Returns
+    ``None`` if the model is unavailable.
+    """
+    global _summariser, _summariser_loaded
+    if _summariser_loaded:
+        return _summariser
+    with _summariser_lock:
+        if not _summariser_loaded:
+            try:
+                try:
+                    _summariser = _load_onnx_summariser()
+                except ImportError:
+                    _summariser = _load_torch_summariser()
+            except Exception:
+                _summariser = None
+            _summariser_loaded = True
+    return _summariser
+
+
+# Concurrent summary requests are coalesced by a background worker into
+# a single batched pipeline call: it waits up to ``SUMMARY_BATCH_WINDOW``
+# seconds for at most ``SUMMARY_BATCH_SIZE`` texts before running them.
+SUMMARY_BATCH_SIZE = 8
+SUMMARY_BATCH_WINDOW = 0.02
+
+summary_queue: "queue.Queue[tuple[bytes, str, Future]]" = queue.Queue()
+_summary_worker: Optional[threading.Thread] = None
+_summary_worker_lock = threading.Lock()
+_summary_submit_lock = threading.Lock()
+
+
+def _run_summariser(summariser, texts: list[str]) -> list[str]:
+    # ``batch_size`` makes the pipeline pad the texts to the longest
+    # member and run one forward pass instead of looping; ``truncation``
+    # cuts descriptions longer than the model's input limit.
+    results = summariser(
+        texts,
+        batch_size=len(texts),
+        truncation=True,
+        max_length=120,
+        min_length=30,
+        do_sample=False,
+    )
+    return [result["summary_text"] for result in results]
+
+
+def _fail_summary(text_hash: bytes, future: Future, exc: Exception) -> None:
+    # Drop the failed future from the cache so the text can be retried,
+    # leaving every other cached summary in place.
+    with _summary_submit_lock:
+        if _summary_futures.get(text_hash) is future:
+            del _summary_futures[text_hash]
+    future.set_exception(exc)
+
+
+def _summary_worker_loop() -> None:
+    while True:
+        batch = [summary_queue.get()]
+        deadline = time.monotonic() + SUMMARY_BATCH_WINDOW
+        while len(batch) < SUMMARY_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(summary_queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        texts = [text for _, text, _ in batch]
+        summariser = get_summariser()
+        if summariser is None:
+            for _, _, future in batch:
+                future.set_result(None)
+            continue
+        try:
+            summaries = _run_summariser(summariser, texts)
+        except Exception as exc:
+            if len(batch) == 1:
+                _fail_summary(batch[0][0], batch[0][2], exc)
+                continue
+            # Run the texts one at a time so that only the one that is
+            # actually at fault fails.
+            for text_hash, text, future in batch:
+                try:
+                    future.set_result(_run_summariser(summariser, [text])[0])
+                except Exception as text_exc:
+                    _fail_summary(text_hash, future, text_exc)
+            continue
+        for (_, _, future), summary in zip(batch, summaries):
+            future.set_result(summary)
+
+
+def _start_summary_worker() -> None:
+    # Started on first use rather than at import so that, with gunicorn's
+    # ``preload_app``, the thread lives in each worker and not the master.
+    global _summary_worker
+    with _summary_worker_lock:
+        if _summary_worker is None or not _summary_worker.is_alive():
+            _summary_worker = threading.Thread(
+                target=_summary_worker_loop, name="summariser", daemon=True
+            )
+            _summary_worker.start()
+
+
+# One future per distinct text, keyed on a 16-byte digest so the cache
+# doesn't keep every description it has seen alive.  Guarded by
+# ``_summary_submit_lock``; the least recently used entry is dropped
+# once it holds ``SUMMARY_CACHE_SIZE`` texts.
+SUMMARY_CACHE_SIZE = 4096
+_summary_futures: "OrderedDict[bytes, Future]" = OrderedDict()
+
+
+def submit_summary(text: str) -> Future:
+    """Queue ``text`` for summarisation and return a future for the
+    result, which is ``None`` if the model is unavailable.  The output is
+    deterministic, so repeated texts share the same future instead of
+    running the model again.
+    """
+    text_hash = hashlib.blake2b(text.encode(), digest_size=16).digest()
+    with _summary_submit_lock:
+        future = _summary_futures.get(text_hash)
+        if future is not None:
+            _summary_futures.move_to_end(text_hash)
+            return future
+        future = Future()
+        future.set_running_or_notify_cancel()
+        _summary_futures[text_hash] = future
+        if len(_summary_futures) > SUMMARY_CACHE_SIZE:
+            _summary_futures.popitem(last=False)
+    _start_summary_worker()
+    summary_queue.put((text_hash, text, future))
+    return future
+
+
+def _fallback_summary(text: str) -> str:
+    # First sentence, cut to 100 chars.  ``partition`` stops at the first
+    # period instead of splitting the whole text.
+    first_sentence = text.partition(".")[0]
+    return (first_sentence[:100] + "...") if len(first_sentence) > 100 else first_sentence
+
+
+# Cases whose summary is being generated in this process, and those
+# whose last attempt failed.  Guarded by ``_case_summary_lock``.
+_case_summary_futures: dict[int, Future] = {}
+_failed_case_summaries: set[int] = set()
+_case_summary_lock = threading.Lock()
+
+
+def queue_case_summary(case_id: int, description: str) -> None:
+    """Generate a case's summary in the background and store it on the
+    row once it is ready.  The first-sentence fallback is stored if the
+    model is unavailable; if generation fails the row is left empty so
+    the summary can be retried, and ``case_summary_failed`` reports it.
+    """
+    def store(future: Future) -> None:
+        with _case_summary_lock:
+            if _case_summary_futures.get(case_id) is future:
+                del _case_summary_futures[case_id]
+            if future.exception() is not None:
+                _failed_case_summaries.add(case_id)
+                return
+        summary = future.result() or _fallback_summary(description)
+        with app.app_context():
+            Case.query.filter_by(id=case_id).update({Case.summary_text: summary})
+            db.session.commit()
+
+    future = submit_summary(description)
+    with _case_summary_lock:
+        _failed_case_summaries.discard(case_id)
+        if _case_summary_futures.get(case_id) is future:
+            return
+        _case_summary_futures[case_id] = future
+    future.add_done_callback(store)
+
+
+def case_summary_failed(case_id: int) -> bool:
+    """Whether the last attempt to summarise the case in this process failed."""
+    with _case_summary_lock:
+        return case_id in _failed_case_summaries
 
 
 def create_app() -> Flask:
@@ -57,10 +333,21 @@ def create_app() -> Flask:
     # environment variable.
     app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "dev-key")
 
+    # Keep compiled templates on disk so restarted workers skip parsing.
+    jinja_cache_dir = os.path.join(BASE_DIR, ".jinja_cache", "flask")
+    os.makedirs(jinja_cache_dir, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(jinja_cache_dir)
+
     db.init_app(app)
 
     with app.app_context():
         db.create_all()
+        # ``create_all`` doesn't alter existing tables, so add columns
+        # introduced after the first release by hand.
+        columns = {c["name"] for c in sa.inspect(db.engine).get_columns("case")}
+        if "summary" not in columns:
+            with db.engine.begin() as conn:
+                conn.execute(sa.text('ALTER TABLE "case" ADD COLUMN summary TEXT'))
 
     return app
 
@@ -79,9 +366,6 @@ class User(db.Model):  # type: ignore[misc]
     def set_password(self, password: str) -> None:
         self.password_hash = generate_password_hash(password)
 
-    def check_password(self, password: str) -> bool:
-        return check_password_hash(self.password_hash, password)
-
 
 class Case(db.Model):  # type: ignore[misc]
     id = db.Column(db.Integer, primary_key=True)
@@ -91,26 +375,17 @@ class Case(db.Model):  # type: ignore[misc]
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     owner_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     tasks = db.relationship("Task", backref="case", lazy=True)
+    # Generated once by ``queue_case_summary`` rather than on every view.
+    summary_text = db.Column("summary", db.Text)
 
     def summary(self) -> str:
-        """Generate a short summary of the case description using the
-        summarisation pipeline.  Falls back to first 100 chars if the
-        model is unavailable.  Summaries are limited to 120 words.
+        """Return the stored summary of the case description, produced
+        by the summarisation pipeline and limited to 120 words.  Until it
+        has been generated, falls back to the first sentence or 100 chars.
         """
-        if summariser:
-            try:
-                result = summariser(
-                    self.description,
-                    max_length=120,
-                    min_length=30,
-                    do_sample=False,
-                )
-                return result[0]["summary_text"]
-            except Exception:
-                pass
-        # Fallback: return first sentence or 100 chars
-        first_sentence = self.description.split(".")[0]
-        return (first_sentence[:100] + "...") if len(first_sentence) > 100 else first_sentence
+        if self.summary_text:
+            return self.summary_text
+        return _fallback_summary(self.description)
 
 
 class Task(db.Model):  # type: ignore[misc]
@@ -121,6 +396,20 @@ class Task(db.Model):  # type: ignore[misc]
     case_id = db.Column(db.Integer, db.ForeignKey("case.id"), nullable=False)
 
 
+def _parse_iso_date(value: str) -> date:
+    """Parse a ``YYYY-MM-DD`` date as sent by ``<input type="date">``.
+
+    Equivalent to ``datetime.strptime(value, "%Y-%m-%d").date()`` for
+    zero-padded input, without compiling a format on every call.  Raises
+    ``ValueError`` if ``value`` isn't a valid date in that format.
+    """
+    digits = value[0:4] + value[5:7] + value[8:10]
+    if (len(value) != 10 or value[4] != "-" or value[7] != "-"
+            or not (digits.isascii() and digits.isdigit())):
+        raise ValueError(f"invalid date: {value!r}")
+    return date(int(value[0:4]), int(value[5:7]), int(value[8:10]))
+
+
 # Flask views
 app = create_app()
 
@@ -153,7 +442,7 @@ def register():
         if not email or not password:
             flash("Email and password required", "danger")
             return redirect(url_for("register"))
-        if User.query.filter_by(email=email).first():
+        if db.session.execute(sa.select(User.id).where(User.email == email)).first():
             flash("Email already registered", "warning")
             return redirect(url_for("register"))
         user = User(email=email)
@@ -170,9 +459,12 @@ def login():
     if request.method == "POST":
         email = request.form.get("email")
         password = request.form.get("password")
-        user = User.query.filter_by(email=email).first()
-        if user and user.check_password(password):
-            session["user_id"] = user.id
+        # Only the id and hash are needed, so skip building a User.
+        row = db.session.execute(
+            sa.select(User.id, User.password_hash).where(User.email == email)
+        ).first()
+        if row and check_password_hash(row.password_hash, password):
+            session["user_id"] = row.id
             flash("Logged in successfully", "success")
             return redirect(url_for("dashboard"))
         flash("Invalid credentials", "danger")
@@ -189,8 +481,10 @@ def logout():
 @app.route("/dashboard")
 @login_required
 def dashboard():
-    user = User.query.get(session["user_id"])
-    return render_template("dashboard.html", cases=user.cases)
+    # Query the cases directly; the User itself is never needed here.
+    cases = Case.query.filter_by(owner_id=session["user_id"]).all()
+    case_summaries = [(case, case.summary()) for case in cases]
+    return render_template("dashboard.html", case_summaries=case_summaries)
 
 
 @app.route("/case/new", methods=["GET", "POST"])
@@ -211,6 +505,7 @@ def new_case():
         )
         db.session.add(case)
         db.session.commit()
+        queue_case_summary(case.id, description)
         flash("Case created", "success")
         return redirect(url_for("dashboard"))
     return render_template("new_case.html")
@@ -239,7 +534,7 @@ def new_task(case_id: int):
         flash("Description and due date required", "danger")
         return redirect(url_for("view_case", case_id=case.id))
     try:
-        due_date = datetime.strptime(due_date_str, "%Y-%m-%d").date()
+        due_date = _parse_iso_date(due_date_str)
     except ValueError:
         flash("Invalid date format", "danger")
         return redirect(url_for("view_case", case_id=case.id))
@@ -269,8 +564,29 @@ def summarise(case_id: int):
     if case.owner_id != session.get("user_id"):
         flash("Access denied", "danger")
         return redirect(url_for("dashboard"))
-    summary = case.summary()
-    return render_template("summary.html", case=case, summary=summary)
+    pending = case.summary_text is None
+    if pending:
+        # Cases created before summaries were stored.
+        queue_case_summary(case.id, case.description)
+    return render_template(
+        "summary.html", case=case, summary=case.summary(), pending=pending
+    )
+
+
+@app.route("/summarise/<int:case_id>/status")
+@login_required
+def summarise_status(case_id: int):
+    """Polled by the summary page while a summary is being generated."""
+    case = Case.query.get_or_404(case_id)
+    if case.owner_id != session.get("user_id"):
+        return jsonify(error="Access denied"), 403
+    if case.summary_text is None:
+        if case_summary_failed(case.id):
+            return jsonify(ready=False, failed=True)
+        # The queue only lives in memory, so a job lost to a worker
+        # restart is queued again; duplicates are merged.
+        queue_case_summary(case.id, case.description)
+    return jsonify(ready=case.summary_text is not None, summary=case.summary())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,75 @@
+"""Gunicorn settings for the Flask app (``gunicorn app:app``).
+
+Each worker serves requests from a pool of threads, so a request
+waiting on SQLite or on the summariser doesn't hold up the others.
+Threads rather than gevent greenlets are used because summarisation is
+CPU-bound native code: it releases the GIL, but it would block a gevent
+hub outright.
+
+The application is imported once in the master process, which also
+prepares the summarisation model before any workers are forked:
+
+* With ``optimum`` installed the ONNX model is exported and quantised
+  in a child process, so workers only load the finished files instead
+  of racing to export them, and the export's torch thread pools never
+  exist in the master that workers are forked from.  The ONNX Runtime
+  sessions are created lazily inside each worker because their thread
+  pools do not survive a fork either.
+* Without it the master loads the PyTorch pipeline itself (pinned to
+  one thread, so it is safe to fork) and every worker shares that single
+  copy of the weights copy-on-write.
+"""
+
+import importlib.util
+import multiprocessing
+import os
+
+bind = "0.0.0.0:" + os.environ.get("PORT", "5000")
+worker_class = "gthread"
+# Concurrency comes from the threads, so keep the process count small:
+# each worker holds its own ONNX session, and although the int8
+# distilbart weights are roughly a quarter of the fp32 model, that is
+# still one copy per process.
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+threads = int(os.environ.get("GUNICORN_THREADS", "8"))
+preload_app = True
+
+
+def when_ready(server):
+    """Prepare the summary model in the master before workers spawn."""
+    # Split the cores between the workers' ONNX sessions.  Uses the final
+    # worker count, so ``-w N`` on the command line is taken into account.
+    os.environ["SUMMARY_THREADS"] = str(
+        max(1, multiprocessing.cpu_count() // server.cfg.workers)
+    )
+    from app import export_summary_model, get_summariser
+
+    if importlib.util.find_spec("optimum") is None:
+        # No optimum: warm the PyTorch pipeline here so workers inherit it.
+        get_summariser()
+        return
+    export = multiprocessing.get_context("spawn").Process(
+        target=export_summary_model, name="summary-model-export"
+    )
+    export.start()
+    export.join()
+    if export.exitcode != 0:
+        # Workers fall back to the PyTorch model or plain first-sentence
+        # summaries; a missing model must not stop the server starting.
+        server.log.warning(
+            "Summary model export failed (exit code %s)", export.exitcode
+        )
+
+
+def post_fork(server, worker):
+    """Drop SQLite connections inherited from the master.
+
+    ``create_app`` touches the database while the app is preloaded, and a
+    SQLite connection must not be used across ``fork()``.  ``close=False``
+    leaves the master's connection alone and just gives this worker a
+    fresh pool.
+    """
+    from app import app, db
+
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -1,70 +1,115 @@
 from __future__ import annotations
 import os
+import re
 import sqlite3
-import uuid
+import threading
+import secrets
 import hashlib
 import hmac
 from datetime import datetime, date
-from typing import Dict, Optional
+from typing import Dict, Iterable, Optional, Tuple
 
 from fastapi import FastAPI, Request, Form, HTTPException
 from fastapi.responses import RedirectResponse, HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
 from starlette.middleware.sessions import SessionMiddleware
 
 DATABASE_PATH = os.path.join(os.path.dirname(__file__), "mvp.sqlite3")
 SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret")
+SESSION_MAX_AGE = 86400
 
 app = FastAPI()
-app.add_middleware(SessionMiddleware, secret_key="a-very-secret-key")
+# Sessions live in an itsdangerous-signed cookie, so any worker can
+# authenticate a request without shared server-side state.
+app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY, max_age=SESSION_MAX_AGE)
 templates = Jinja2Templates(directory=os.path.join(os.path.dirname(__file__), "templates"))
+# Keep compiled templates on disk so restarted workers skip parsing, and
+# don't stat template files on every render.
+_jinja_cache_dir = os.path.join(os.path.dirname(__file__), ".jinja_cache", "fastapi")
+os.makedirs(_jinja_cache_dir, exist_ok=True)
+templates.env.bytecode_cache = FileSystemBytecodeCache(_jinja_cache_dir)
+templates.env.auto_reload = False
+
+_local = threading.local()
 
 def get_db_connection() -> sqlite3.Connection:
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
+    # One long-lived connection per thread, in autocommit mode with WAL
+    # journaling so readers never block on writers.
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DATABASE_PATH, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")
+        _local.conn = conn
     return conn
 
 def init_db() -> None:
     conn = get_db_connection()
     cur = conn.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            email TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            salt TEXT NOT NULL
-        );
-    """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS cases (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            client_name TEXT NOT NULL,
-            description TEXT NOT NULL,
-            created_at TEXT NOT NULL,
-            owner_id INTEGER NOT NULL,
-            FOREIGN KEY(owner_id) REFERENCES users(id)
-        );
-    """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS tasks (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            description TEXT NOT NULL,
-            due_date TEXT NOT NULL,
-            completed INTEGER NOT NULL DEFAULT 0,
-            case_id INTEGER NOT NULL,
-            FOREIGN KEY(case_id) REFERENCES cases(id)
-        );
-    """)
-    conn.commit()
-    conn.close()
+    # The connection is in autocommit mode, so open the transaction
+    # explicitly; `with conn` commits it, or rolls back on error.
+    with conn:
+        cur.execute("BEGIN")
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                email TEXT UNIQUE NOT NULL,
+                password_hash TEXT NOT NULL,
+                salt TEXT NOT NULL
+            );
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS cases (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                client_name TEXT NOT NULL,
+                description TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                owner_id INTEGER NOT NULL,
+                summary TEXT,
+                FOREIGN KEY(owner_id) REFERENCES users(id)
+            );
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                description TEXT NOT NULL,
+                due_date TEXT NOT NULL,
+                completed INTEGER NOT NULL DEFAULT 0,
+                case_id INTEGER NOT NULL,
+                FOREIGN KEY(case_id) REFERENCES cases(id)
+            );
+        """)
+        # Databases created before summaries were stored: add the column and
+        # fill it in for existing cases.
+        columns = {row["name"] for row in cur.execute("PRAGMA table_info(cases)")}
+        if "summary" not in columns:
+            cur.execute("ALTER TABLE cases ADD COLUMN summary TEXT")
+        rows = cur.execute("SELECT id, description FROM cases WHERE summary IS NULL").fetchall()
+        cur.executemany("UPDATE cases SET summary = ? WHERE id = ?",
+                        [(summarise_text(row["description"]), row["id"]) for row in rows])
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_cases_owner ON cases(owner_id)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_tasks_case ON tasks(case_id)")
+
+_SCRYPT_PREFIX = "scrypt$"
 
 def hash_password(password: str, salt: str) -> str:
+    # scrypt runs entirely inside OpenSSL; n=2**14, r=8 costs ~16 MB and
+    # tens of milliseconds per hash, which is the point for a password KDF.
+    # The prefix tells these apart from hashes made by _legacy_hash_password.
+    return _SCRYPT_PREFIX + hashlib.scrypt(password.encode(), salt=bytes.fromhex(salt), n=2**14, r=8, p=1, dklen=32).hex()
+
+def _legacy_hash_password(password: str, salt: str) -> str:
+    # Original HMAC-SHA256 scheme; only used to verify old accounts.
     return hmac.new(salt.encode(), password.encode(), hashlib.sha256).hexdigest()
 
 def create_user(email: str, password: str) -> Optional[int]:
-    salt = uuid.uuid4().hex
+    salt = secrets.token_hex(16)
     pw_hash = hash_password(password, salt)
     conn = get_db_connection()
     cur = conn.cursor()
@@ -73,39 +118,43 @@ def create_user(email: str, password: str) -> Optional[int]:
             "INSERT INTO users (email, password_hash, salt) VALUES (?, ?, ?)",
             (email, pw_hash, salt),
         )
-        conn.commit()
         return cur.lastrowid
     except sqlite3.IntegrityError:
         return None
-    finally:
-        conn.close()
 
 def authenticate_user(email: str, password: str) -> Optional[int]:
     conn = get_db_connection()
     cur = conn.cursor()
     cur.execute("SELECT id, password_hash, salt FROM users WHERE email = ?", (email,))
     row = cur.fetchone()
-    conn.close()
-    if row:
-        pw_hash = hash_password(password, row["salt"])
-        if hmac.compare_digest(pw_hash, row["password_hash"]):
+    if row is None:
+        return None
+    stored = row["password_hash"]
+    if stored.startswith(_SCRYPT_PREFIX):
+        if hmac.compare_digest(hash_password(password, row["salt"]), stored):
             return row["id"]
+        return None
+    if hmac.compare_digest(_legacy_hash_password(password, row["salt"]), stored):
+        # Upgrade the account to scrypt now that we know the password.
+        # Old salts may not be hex, so issue a fresh one.
+        salt = secrets.token_hex(16)
+        cur.execute("UPDATE users SET password_hash = ?, salt = ? WHERE id = ?",
+                    (hash_password(password, salt), salt, row["id"]))
+        return row["id"]
     return None
 
 def get_user_cases(user_id: int):
     conn = get_db_connection()
     cur = conn.cursor()
-    cur.execute("SELECT id, title, client_name, description, created_at FROM cases WHERE owner_id = ? ORDER BY created_at DESC", (user_id,))
+    cur.execute("SELECT id, title, client_name, description, created_at, summary FROM cases WHERE owner_id = ? ORDER BY created_at DESC", (user_id,))
     cases = cur.fetchall()
-    conn.close()
     return cases
 
-def get_case(case_id: int) -> Optional[sqlite3.Row]:
+def get_case_for_owner(case_id: int, owner_id: int) -> Optional[sqlite3.Row]:
     conn = get_db_connection()
     cur = conn.cursor()
-    cur.execute("SELECT id, title, client_name, description, created_at, owner_id FROM cases WHERE id = ?", (case_id,))
+    cur.execute("SELECT id, title, client_name, description, created_at, summary FROM cases WHERE id = ? AND owner_id = ?", (case_id, owner_id))
     case = cur.fetchone()
-    conn.close()
     return case
 
 def get_case_tasks(case_id: int):
@@ -113,17 +162,14 @@ def get_case_tasks(case_id: int):
     cur = conn.cursor()
     cur.execute("SELECT id, description, due_date, completed FROM tasks WHERE case_id = ? ORDER BY due_date", (case_id,))
     tasks = cur.fetchall()
-    conn.close()
     return tasks
 
 def add_case(owner_id: int, title: str, client_name: str, description: str) -> int:
     conn = get_db_connection()
     cur = conn.cursor()
-    cur.execute("INSERT INTO cases (title, client_name, description, created_at, owner_id) VALUES (?, ?, ?, ?, ?)",
-                (title, client_name, description, datetime.utcnow().isoformat(), owner_id))
-    conn.commit()
+    cur.execute("INSERT INTO cases (title, client_name, description, created_at, owner_id, summary) VALUES (?, ?, ?, ?, ?, ?)",
+                (title, client_name, description, datetime.utcnow().isoformat(), owner_id, summarise_text(description)))
     case_id = cur.lastrowid
-    conn.close()
     return case_id
 
 def add_task(case_id: int, description: str, due_date: date) -> int:
@@ -131,27 +177,46 @@ def add_task(case_id: int, description: str, due_date: date) -> int:
     cur = conn.cursor()
     cur.execute("INSERT INTO tasks (description, due_date, case_id) VALUES (?, ?, ?)",
                 (description, due_date.isoformat(), case_id))
-    conn.commit()
     task_id = cur.lastrowid
-    conn.close()
     return task_id
 
+def add_tasks(case_id: int, items: Iterable[Tuple[str, date]]) -> None:
+    # Bulk insert of (description, due_date) pairs in one transaction.
+    conn = get_db_connection()
+    with conn:
+        conn.execute("BEGIN")
+        conn.executemany("INSERT INTO tasks (description, due_date, case_id) VALUES (?, ?, ?)",
+                         [(description, due_date.isoformat(), case_id) for description, due_date in items])
+
 def toggle_task_completion(task_id: int) -> None:
     conn = get_db_connection()
     cur = conn.cursor()
-    cur.execute("SELECT completed FROM tasks WHERE id = ?", (task_id,))
-    row = cur.fetchone()
-    if row is None:
-        conn.close()
+    # Flip the flag in SQL rather than reading it back first.
+    cur.execute("UPDATE tasks SET completed = 1 - completed WHERE id = ?", (task_id,))
+    if cur.rowcount == 0:
         raise HTTPException(status_code=404, detail="Task not found")
-    new_status = 0 if row["completed"] else 1
-    cur.execute("UPDATE tasks SET completed = ? WHERE id = ?", (new_status, task_id))
-    conn.commit()
-    conn.close()
+
+# A non-blank run of text between periods, starting at its first
+# non-space character.
+_SENTENCE_RE = re.compile(r"[^.\s][^.]*")
 
 def summarise_text(text: str, max_sentences: int = 2) -> str:
-    sentences = [s.strip() for s in text.split(".") if s.strip()]
-    return ". ".join(sentences[:max_sentences]) + ("..." if len(sentences) > max_sentences else "")
+    # Stream the sentences and stop as soon as we know there are more
+    # than we need, instead of splitting the whole description.
+    sentences = []
+    for match in _SENTENCE_RE.finditer(text):
+        if len(sentences) == max_sentences:
+            return ". ".join(sentences) + "..."
+        sentences.append(match.group().rstrip())
+    return ". ".join(sentences)
+
+def _parse_iso_date(value: str) -> date:
+    # Fixed-width YYYY-MM-DD parse; strptime compiles the format on
+    # every call. Raises ValueError like strptime does.
+    digits = value[0:4] + value[5:7] + value[8:10]
+    if len(value) != 10 or value[4] != "-" or value[7] != "-" or not (digits.isascii() and digits.isdigit()):
+        raise ValueError(f"invalid date: {value!r}")
+    return date(int(value[0:4]), int(value[5:7]), int(value[8:10]))
 
 @app.on_event("startup")
 def startup_event() -> None:
@@ -207,7 +272,8 @@ def logout(request: Request):
 def dashboard(request: Request):
     user_id = require_login(request)
     cases = get_user_cases(user_id)
-    return templates.TemplateResponse("dashboard.html", {"request": request, "cases": cases, "summarise": summarise_text})
+    case_summaries = [(case, case["summary"]) for case in cases]
+    return templates.TemplateResponse("dashboard.html", {"request": request, "case_summaries": case_summaries})
 
 @app.get("/case/new", response_class=HTMLResponse, name="new_case")
 def new_case_get(request: Request):
@@ -223,8 +289,8 @@ def new_case_post(request: Request, title: str = Form(...), client_name: str = F
 @app.get("/case/{case_id}", response_class=HTMLResponse, name="view_case")
 def case_detail(request: Request, case_id: int):
     user_id = require_login(request)
-    case = get_case(case_id)
-    if case is None or case["owner_id"] != user_id:
+    case = get_case_for_owner(case_id, user_id)
+    if case is None:
         raise HTTPException(status_code=404, detail="Case not found")
     tasks = get_case_tasks(case_id)
     return templates.TemplateResponse("view_case.html", {"request": request, "case": case, "tasks": tasks})
@@ -232,10 +298,10 @@ def case_detail(request: Request, case_id: int):
 @app.post("/case/{case_id}/task/new")
 def add_task_route(request: Request, case_id: int, description: str = Form(...), due_date: str = Form(...)):
     user_id = require_login(request)
-    case = get_case(case_id)
-    if case is None or case["owner_id"] != user_id:
+    case = get_case_for_owner(case_id, user_id)
+    if case is None:
         raise HTTPException(status_code=404, detail="Case not found")
-    due = datetime.strptime(due_date, "%Y-%m-%d").date()
+    due = _parse_iso_date(due_date)
     add_task(case_id, description, due)
     return RedirectResponse(url=f"/case/{case_id}", status_code=303)
 
@@ -244,25 +310,23 @@ def toggle_task_route(request: Request, task_id: int):
     user_id = require_login(request)
     conn = get_db_connection()
     cur = conn.cursor()
-    cur.execute("SELECT case_id FROM tasks WHERE id = ?", (task_id,))
+    # Only one column is needed, so skip sqlite3.Row and index the tuple.
+    cur.row_factory = None
+    cur.execute("SELECT c.id FROM tasks t JOIN cases c ON t.case_id = c.id WHERE t.id = ? AND c.owner_id = ?", (task_id, user_id))
     row = cur.fetchone()
-    conn.close()
     if row is None:
         raise HTTPException(status_code=404, detail="Task not found")
-    case_id = row["case_id"]
-    case = get_case(case_id)
-    if case is None or case["owner_id"] != user_id:
-        raise HTTPException(status_code=404, detail="Case not found")
+    case_id = row[0]
     toggle_task_completion(task_id)
     return RedirectResponse(url=f"/case/{case_id}", status_code=303)
 
 @app.get("/summarise/{case_id}", response_class=HTMLResponse, name="summarise_case")
 def summarise_case(request: Request, case_id: int):
     user_id = require_login(request)
-    case = get_case(case_id)
-    if case is None or case["owner_id"] != user_id:
+    case = get_case_for_owner(case_id, user_id)
+    if case is None:
         raise HTTPException(status_code=404, detail="Case not found")
-    summary = summarise_text(case["description"])
+    summary = case["summary"]
     return templates.TemplateResponse("summary.html", {"request": request, "case": case, "summary": summary})
 
 app.mount("/static", StaticFiles(directory=".", html=True), name="static")
@@ -273,4 +337,6 @@ if os.path.isdir(static_dir):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8080)
+    # Multiple workers need the app as an import string so each process
+    # can import it itself.
+    uvicorn.run("main:app", host="0.0.0.0", port=8080, workers=int(os.environ.get("WEB_CONCURRENCY", "1")))